@@ -14,94 +14,264 @@ Output:
     outputs/portfolio.json (compatible with Observable dashboard)
 """
 
+import gzip
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import defaultdict
+from heapq import nlargest
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Above this size, stream-parse trade_state.json instead of loading it whole
+STREAM_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+# Fixed snapshot formats, hoisted so hot loops never rebuild the literals
+SNAPSHOT_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+DATE_FMT = "%Y-%m-%d"
+
+if njit is not None and np is not None:
+    @njit(cache=True)
+    def _bucket_sum(ordinals, values, out, base):
+        """JIT-compiled scalar reduction: sum values into per-day buckets."""
+        for i in range(ordinals.size):
+            out[ordinals[i] - base] += values[i]
 
 def load_accounts_from_json(filename="trade_state.json"):
     """Load Account objects from JSON file."""
     if not os.path.exists(filename):
         raise FileNotFoundError(f"{filename} not found")
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # orjson decodes large performance_log arrays several times faster
+    # than stdlib json; fall back transparently when it isn't installed
+    if orjson is not None:
+        with open(filename, 'rb') as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
 
     return data  # List of account dicts
 
-def aggregate_daily_performance(accounts):
+def _recent_history(daily_values):
     """
-    Aggregate 5-minute performance_log snapshots to daily end-of-day values.
+    Most recent 60 days as a chronological history list.
 
-    Args:
-        accounts: List of account dictionaries
+    ISO date keys sort lexicographically, so heapq.nlargest picks the
+    newest 60 in O(N log 60) instead of sorting every key just to drop
+    all but the tail.
+    """
+    recent = nlargest(60, daily_values.items())
+    recent.sort()
+    return [{"date": date_str, "value": int(value)}
+            for date_str, value in recent]
+
+def stream_load_and_aggregate(filename="trade_state.json"):
+    """
+    Stream-parse trade_state.json with ijson, aggregating performance logs
+    on the fly so they never sit in memory all at once.
+
+    Each account dict is yielded one at a time; its performance_log is
+    consumed into the daily accumulator and dropped, so peak RSS stays at
+    one account's log instead of the whole file.
 
     Returns:
-        List of {"date": "YYYY-MM-DD", "value": total_portfolio_value}
+        Tuple of (accounts, history, totals) — accounts have their
+        performance_log stripped, history/totals match
+        aggregate_daily_performance output.
     """
-    # Collect all timestamps and values across all accounts
-    daily_values = defaultdict(lambda: {"total_value": 0, "timestamp": None})
+    daily_values = defaultdict(float)
+    totals = {"total_value": 0, "total_principal": 0, "total_cash": 0}
+    accounts = []
 
-    for account in accounts:
-        performance_log = account.get("performance_log", [])
+    # Local bindings keep the per-snapshot loop free of global lookups
+    # (ijson yields Decimal for numbers, hence the float() coercion)
+    _float = float
+    _len = len
 
-        for snapshot in performance_log:
-            timestamp_str = snapshot["time"]
-            total_value = snapshot["total_value"]
+    with open(filename, 'rb') as f:
+        for account in ijson.items(f, 'item'):
+            totals["total_principal"] += _float(account.get("principal", 0))
+            totals["total_cash"] += _float(account.get("balance", 0))
 
-            # Parse timestamp
-            try:
-                dt = datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                # Try alternative format if needed
-                continue
+            performance_log = account.pop("performance_log", [])
+            if performance_log:
+                totals["total_value"] += _float(performance_log[-1]["total_value"])
+                for snapshot in performance_log:
+                    timestamp_str = snapshot["time"]
+                    if _len(timestamp_str) < 19 or timestamp_str[4] != '-':
+                        continue
+                    daily_values[timestamp_str[:10]] += _float(snapshot["total_value"])
 
-            date_key = dt.strftime("%Y-%m-%d")
+            accounts.append(account)
 
-            # Accumulate total value across all accounts
-            daily_values[date_key]["total_value"] += total_value
+    return accounts, _recent_history(daily_values), totals
 
-            # Keep the latest timestamp for each day (for sorting)
-            if daily_values[date_key]["timestamp"] is None or dt > daily_values[date_key]["timestamp"]:
-                daily_values[date_key]["timestamp"] = dt
+def aggregate_daily_performance(accounts):
+    """
+    Aggregate 5-minute performance_log snapshots to daily end-of-day values.
 
-    # Convert to sorted list
-    history = []
-    for date_str in sorted(daily_values.keys()):
-        history.append({
-            "date": date_str,
-            "value": int(daily_values[date_str]["total_value"])
-        })
+    Args:
+        accounts: List of account dictionaries
 
-    # Limit to last 60 days
-    if len(history) > 60:
-        history = history[-60:]
+    Returns:
+        Tuple of (history, totals):
+        - history: List of {"date": "YYYY-MM-DD", "value": total_portfolio_value}
+        - totals: Running sums (latest value, principal, balance) collected
+          in the same pass for get_current_summary
+    """
+    # Flatten snapshots into (time, total_value) rows while also collecting
+    # the per-account sums the summary needs — one walk instead of two
+    rows = []
+    totals = {"total_value": 0, "total_principal": 0, "total_cash": 0}
 
-    return history
+    for account in accounts:
+        totals["total_principal"] += account.get("principal", 0)
+        totals["total_cash"] += account.get("balance", 0)
 
-def get_current_summary(accounts, history):
+        performance_log = account.get("performance_log", [])
+        if performance_log:
+            # Latest snapshot is the last entry; grab it in the same pass
+            totals["total_value"] += performance_log[-1]["total_value"]
+            rows.extend((snapshot["time"], snapshot["total_value"])
+                        for snapshot in performance_log)
+
+    if not rows:
+        return [], totals
+
+    # Vectorized path: one C-level parse + groupby instead of a Python loop
+    # over every 5-minute snapshot
+    if pd is not None:
+        return _aggregate_daily_pandas(rows), totals
+
+    if njit is not None and np is not None:
+        return _aggregate_daily_numba(rows), totals
+
+    if np is not None:
+        return _aggregate_daily_numpy(rows), totals
+
+    return _aggregate_daily_python(rows), totals
+
+def _aggregate_daily_pandas(rows):
+    """Vectorized daily aggregation using pandas (preferred for large logs)."""
+    df = pd.DataFrame(rows, columns=["time", "total_value"])
+    df["time"] = pd.to_datetime(df["time"], format=SNAPSHOT_TIME_FMT,
+                                errors="coerce", cache=True)
+    df = df.dropna(subset=["time"])
+
+    daily = (df.groupby(df["time"].dt.strftime(DATE_FMT))["total_value"]
+               .sum()
+               .sort_index()
+               .tail(60))
+
+    return [{"date": date_str, "value": int(value)}
+            for date_str, value in daily.items()]
+
+def _aggregate_daily_numba(rows):
+    """Numba fallback: bucket sums run as a compiled loop over flat arrays."""
+    # Snapshots repeat the same date ~all day, so ordinal conversion is
+    # memoized per unique date rather than parsed per row
+    ordinal_memo = {}
+    ordinals = np.empty(len(rows), dtype=np.int32)
+    values = np.empty(len(rows), dtype=np.float64)
+    n = 0
+
+    for timestamp_str, total_value in rows:
+        date_key = timestamp_str[:10]
+        ordinal = ordinal_memo.get(date_key)
+        if ordinal is None:
+            try:
+                ordinal = date.fromisoformat(date_key).toordinal()
+            except ValueError:
+                continue
+            ordinal_memo[date_key] = ordinal
+        ordinals[n] = ordinal
+        values[n] = total_value
+        n += 1
+
+    if n == 0:
+        return []
+
+    base = min(ordinal_memo.values())
+    out = np.zeros(max(ordinal_memo.values()) - base + 1, dtype=np.float64)
+    _bucket_sum(ordinals[:n], values[:n], out, base)
+
+    return [{"date": date_key, "value": int(out[ordinal - base])}
+            for date_key, ordinal in sorted(ordinal_memo.items())[-60:]]
+
+def _aggregate_daily_numpy(rows):
+    """NumPy fallback: column arrays + bincount instead of per-dict probes."""
+    # Drop malformed timestamps up front, same sanity check as the
+    # pure-Python tier — a bad key would otherwise land in the history
+    rows = [r for r in rows if len(r[0]) >= 19 and r[0][4] == '-']
+    if not rows:
+        return []
+
+    # Structure-of-arrays: one contiguous string column, one value column
+    times = np.array([r[0] for r in rows], dtype='U19')
+    values = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+
+    # Casting U19 -> U10 truncates to the "YYYY-MM-DD" prefix
+    dates = times.astype('U10')
+    unique_dates, inverse = np.unique(dates, return_inverse=True)
+    totals = np.bincount(inverse, weights=values)
+
+    # unique_dates is already sorted; keep only the last 60 days
+    start = max(0, unique_dates.size - 60)
+    return [{"date": str(unique_dates[i]), "value": int(totals[i])}
+            for i in range(start, unique_dates.size)]
+
+def _aggregate_daily_python(rows):
+    """Pure-Python fallback when pandas is not installed."""
+    daily_values = defaultdict(float)
+
+    for timestamp_str, total_value in rows:
+        # Timestamps are fixed-format "YYYY-MM-DD HH:MM:SS", so the date key
+        # is just the first 10 characters — no strptime needed
+        if len(timestamp_str) < 19 or timestamp_str[4] != '-':
+            continue
+
+        daily_values[timestamp_str[:10]] += total_value
+
+    return _recent_history(daily_values)
+
+def get_current_summary(totals, history):
     """
     Calculate current portfolio summary metrics.
 
     Args:
-        accounts: List of account dictionaries
+        totals: Pre-computed sums from aggregate_daily_performance
         history: List of daily values
 
     Returns:
         Dictionary with summary metrics
     """
-    total_value = 0
-    total_principal = 0
-    total_cash = 0
-
-    for account in accounts:
-        total_principal += account.get("principal", 0)
-        total_cash += account.get("balance", 0)
-
-        # Get latest total value from performance_log
-        perf_log = account.get("performance_log", [])
-        if perf_log:
-            total_value += perf_log[-1]["total_value"]
+    total_value = totals["total_value"]
+    total_principal = totals["total_principal"]
+    total_cash = totals["total_cash"]
 
     # Calculate returns
     total_pnl = total_value - total_principal
@@ -129,54 +299,130 @@ def get_current_summary(accounts, history):
         "cash_percent": round(cash_percent, 2)
     }
 
-def get_current_holdings(accounts, current_prices=None):
+def get_current_holdings(accounts, current_prices=None, sector_map=None):
     """
     Get detailed holdings from all accounts.
 
     Args:
         accounts: List of account dictionaries
         current_prices: Optional dict of {code: current_price}
+        sector_map: Optional dict of {code: sector_name}
 
     Returns:
         List of holding dictionaries
     """
-    # Aggregate holdings across all accounts
+    # Long-form rows: one record per (account, code) position
+    records = [{"code": code,
+                "qty": holding["qty"],
+                "total_cost": holding["total_cost"],
+                "account": account.get("account_id", "Unknown")}
+               for account in accounts
+               for code, holding in account.get("holdings", {}).items()]
+
+    if not records:
+        return []
+
+    sector_get = (sector_map or {}).get
+
+    if pd is not None:
+        return _aggregate_holdings_pandas(records, current_prices, sector_get)
+
+    return _aggregate_holdings_python(records, current_prices, sector_get)
+
+def _aggregate_holdings_pandas(records, current_prices, sector_get):
+    """Vectorized holdings aggregation: one groupby, columnar arithmetic."""
+    df = pd.DataFrame(records)
+    grouped = df.groupby("code", sort=False).agg(
+        qty=("qty", "sum"),
+        total_cost=("total_cost", "sum"),
+        account=("account", lambda s: ", ".join(list(s)[:2])),  # first 2 accounts
+    ).reset_index()
+
+    grouped["avg_price"] = (grouped["total_cost"]
+                            / grouped["qty"].where(grouped["qty"] > 0)).fillna(0)
+    if current_prices:
+        grouped["current_price"] = (grouped["code"].map(current_prices)
+                                    .fillna(grouped["avg_price"]))
+        grouped["value"] = grouped["current_price"] * grouped["qty"]
+        grouped["pnl"] = grouped["value"] - grouped["total_cost"]
+        grouped["pnl_percent"] = (grouped["pnl"]
+                                  / grouped["total_cost"].where(grouped["total_cost"] > 0)
+                                  * 100).fillna(0)
+    else:
+        # Fast path: valued at cost, so PnL is zero by construction
+        grouped["current_price"] = grouped["avg_price"]
+        grouped["value"] = grouped["total_cost"]
+        grouped["pnl"] = 0
+        grouped["pnl_percent"] = 0.0
+    grouped = grouped.sort_values("value", ascending=False)
+
+    return [{
+        "name": row.code,  # You can map code to name later
+        "sector": sector_get(row.code, "Unknown"),
+        "quantity": int(row.qty),
+        "avg_price": int(row.avg_price),
+        "current_price": int(row.current_price),
+        "value": int(row.value),
+        "pnl": int(row.pnl),
+        "pnl_percent": round(float(row.pnl_percent), 2),
+        "account": row.account
+    } for row in grouped.itertuples()]
+
+def _aggregate_holdings_python(records, current_prices, sector_get):
+    """Pure-Python fallback when pandas is not installed."""
     aggregated_holdings = defaultdict(lambda: {
         "qty": 0,
         "total_cost": 0,
         "accounts": []
     })
 
-    for account in accounts:
-        account_id = account.get("account_id", "Unknown")
-        holdings = account.get("holdings", {})
-
-        for code, holding in holdings.items():
-            aggregated_holdings[code]["qty"] += holding["qty"]
-            aggregated_holdings[code]["total_cost"] += holding["total_cost"]
-            aggregated_holdings[code]["accounts"].append(account_id)
+    for record in records:
+        data = aggregated_holdings[record["code"]]
+        data["qty"] += record["qty"]
+        data["total_cost"] += record["total_cost"]
+        data["accounts"].append(record["account"])
 
     # Convert to list format for dashboard
     holdings_list = []
 
+    if not current_prices:
+        # Fast path (the default configuration): every position is valued at
+        # cost, so value == total_cost and PnL is zero by construction
+        for code, data in aggregated_holdings.items():
+            qty = data["qty"]
+            total_cost = data["total_cost"]
+            avg_price = int(total_cost / qty) if qty > 0 else 0
+
+            holdings_list.append({
+                "name": code,  # You can map code to name later
+                "sector": sector_get(code, "Unknown"),
+                "quantity": qty,
+                "avg_price": avg_price,
+                "current_price": avg_price,
+                "value": int(total_cost),
+                "pnl": 0,
+                "pnl_percent": 0.0,
+                "account": ", ".join(data["accounts"][:2])  # Show first 2 accounts
+            })
+
+        holdings_list.sort(key=lambda x: x["value"], reverse=True)
+        return holdings_list
+
     for code, data in aggregated_holdings.items():
         qty = data["qty"]
         total_cost = data["total_cost"]
         avg_price = total_cost / qty if qty > 0 else 0
 
         # Use current price if provided, otherwise use avg_price
-        current_price = current_prices.get(code, avg_price) if current_prices else avg_price
+        current_price = current_prices.get(code, avg_price)
 
         value = current_price * qty
         pnl = value - total_cost
         pnl_percent = (pnl / total_cost * 100) if total_cost > 0 else 0
 
-        # Determine sector (you can enhance this with a lookup table)
-        sector = "Technology"  # Default, can be mapped based on code
-
         holdings_list.append({
             "name": code,  # You can map code to name later
-            "sector": sector,
+            "sector": sector_get(code, "Unknown"),
             "quantity": qty,
             "avg_price": int(avg_price),
             "current_price": int(current_price),
@@ -224,7 +470,7 @@ def get_account_breakdown(accounts):
 
     return account_list
 
-def export_portfolio_json(accounts, output_path="outputs/portfolio.json", current_prices=None):
+def export_portfolio_json(accounts, output_path="outputs/portfolio.json", current_prices=None, sector_map=None, history_totals=None):
     """
     Main export function to create dashboard-compatible JSON.
 
@@ -232,19 +478,25 @@ def export_portfolio_json(accounts, output_path="outputs/portfolio.json", curren
         accounts: List of account dictionaries
         output_path: Path to output JSON file
         current_prices: Optional dict of {code: current_price}
+        sector_map: Optional dict of {code: sector_name}
+        history_totals: Optional (history, totals) tuple precomputed by
+            stream_load_and_aggregate, skipping the in-memory aggregation
     """
-    # 1. Aggregate daily performance history
+    # 1. Aggregate daily performance history (also collects summary totals)
     print("Aggregating performance history...")
-    history = aggregate_daily_performance(accounts)
+    if history_totals is not None:
+        history, totals = history_totals
+    else:
+        history, totals = aggregate_daily_performance(accounts)
     print(f"  Found {len(history)} days of history")
 
     # 2. Calculate current summary
     print("Calculating summary metrics...")
-    summary = get_current_summary(accounts, history)
+    summary = get_current_summary(totals, history)
 
     # 3. Get current holdings
     print("Processing holdings...")
-    holdings = get_current_holdings(accounts, current_prices)
+    holdings = get_current_holdings(accounts, current_prices, sector_map)
     print(f"  Found {len(holdings)} holdings")
 
     # 4. Get account breakdown
@@ -262,8 +514,22 @@ def export_portfolio_json(accounts, output_path="outputs/portfolio.json", curren
     # 6. Export to JSON
     os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(portfolio_data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        blob = orjson.dumps(portfolio_data,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        blob = json.dumps(portfolio_data, indent=2, ensure_ascii=False).encode('utf-8')
+
+    # Write to a temp file then os.replace so readers never see partial JSON
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(blob)
+    os.replace(tmp_path, output_path)
+
+    # Optional compressed sibling for consumers pulling over the network
+    if os.environ.get("PORTFOLIO_GZIP"):
+        with gzip.open(output_path + ".gz", 'wb', compresslevel=1) as g:
+            g.write(blob)
 
     print(f"\n✓ Portfolio data exported to {output_path}")
     print(f"  Total Value: ₩{summary['total_value']:,}")
@@ -277,10 +543,19 @@ def main():
     """Main execution function."""
     print("=== Portfolio Data Export ===\n")
 
-    # Load accounts from trade_state.json
+    # Load accounts from trade_state.json; stream-parse when the file is
+    # large enough that a full in-memory load would spike RSS
+    history_totals = None
     try:
-        accounts = load_accounts_from_json("trade_state.json")
-        print(f"Loaded {len(accounts)} account(s) from trade_state.json\n")
+        if (ijson is not None
+                and os.path.exists("trade_state.json")
+                and os.path.getsize("trade_state.json") > STREAM_THRESHOLD_BYTES):
+            accounts, history, totals = stream_load_and_aggregate("trade_state.json")
+            history_totals = (history, totals)
+            print(f"Streamed {len(accounts)} account(s) from trade_state.json\n")
+        else:
+            accounts = load_accounts_from_json("trade_state.json")
+            print(f"Loaded {len(accounts)} account(s) from trade_state.json\n")
     except FileNotFoundError as e:
         print(f"Error: {e}")
         print("Please ensure trade_state.json exists in the current directory")
@@ -294,7 +569,8 @@ def main():
     }
 
     # Export to portfolio.json
-    export_portfolio_json(accounts, "outputs/portfolio.json", current_prices)
+    export_portfolio_json(accounts, "outputs/portfolio.json", current_prices,
+                          history_totals=history_totals)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,7 @@
 import sys
+import bisect
+import gzip
+import hashlib
 import json
 import time
 import datetime
@@ -6,6 +9,11 @@ import os
 from PyQt5.QtWidgets import QApplication
 from kiwoom_api import Kiwoom
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Default Portfolio Structure
 DEFAULT_PORTFOLIO = {
     "summary": {
@@ -26,35 +34,56 @@ OUTPUT_DIR = "outputs"
 PORTFOLIO_FILE = os.path.join(OUTPUT_DIR, "portfolio.json")
 MAX_HISTORY_DAYS = 60
 
+# Account numbers never queried for TR data; extend via "skip_accounts"
+# in config.json
+SKIP_ACCOUNTS = {"", "7032756831"}
+
+# Resolve the output directory once at import so the per-run check vanishes
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Digest of the last portfolio.json written; identical content means the
+# write (and any downstream git sync) can be skipped entirely
+_last_digest = None
+
 def load_portfolio(filepath=PORTFOLIO_FILE):
     if os.path.exists(filepath):
         try:
+            if orjson is not None:
+                with open(filepath, "rb") as f:
+                    return orjson.loads(f.read())
             with open(filepath, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception as e:
             print(f"Error loading existing portfolio: {e}")
     return DEFAULT_PORTFOLIO
 
-def fetch_and_generate_portfolio(kiwoom):
+def fetch_and_generate_portfolio(kiwoom, prices=None):
     """
     Fetches data using an existing Kiwoom instance and generates portfolio.json.
-    """
-    # Ensure output directory exists
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
-        print(f"Created directory: {OUTPUT_DIR}")
 
+    prices is an optional {code: current_price} dict already fetched this
+    iteration (e.g. by update_account_snapshots); it backfills holdings the
+    evaluation TR returns without a usable price, avoiding a re-query.
+
+    Returns the content digest (truthy) on success — unchanged content skips
+    the file write but still returns its digest — or a falsy value on failure.
+    """
     print("Fetching account info...")
     accounts_list = kiwoom.get_login_info("ACCNO")
     if not accounts_list:
         print("No accounts found.")
         return False
 
+    # Deduplicate while preserving order — each redundant account costs a
+    # rate-limited TR round-trip plus the 0.3s sleep
+    accounts_list = list(dict.fromkeys(accounts_list))
+
     # Load Config for Sector Map & Virtual Accounts
     script_dir = os.path.dirname(os.path.abspath(__file__))
     config_path = os.path.join(script_dir, "config.json")
     print(f"Loading config from: {config_path}")
     sector_map = {}
+    strategies_by_code = {}
     config = {}
 
     if os.path.exists(config_path):
@@ -62,14 +91,19 @@ def fetch_and_generate_portfolio(kiwoom):
             with open(config_path, "r", encoding="utf-8") as f:
                 config = json.load(f)
 
-            # Build Sector Map
+            # Build Sector Map + strategy index in one pass over config
             if "strategies" in config:
                 for strategy in config["strategies"]:
-                    if "stock_code" in strategy and "sector" in strategy:
-                        sector_map[strategy["stock_code"]] = strategy["sector"]
+                    if "stock_code" in strategy:
+                        strategies_by_code[strategy["stock_code"]] = strategy
+                        if "sector" in strategy:
+                            sector_map[strategy["stock_code"]] = strategy["sector"]
         except Exception as e:
             print(f"Error loading config: {e}")
 
+    # Bound method avoids re-resolving the attribute per holding row
+    sector_get = sector_map.get
+
     # Data Aggregators
     total_value = 0
     total_cash_all = 0
@@ -80,12 +114,19 @@ def fetch_and_generate_portfolio(kiwoom):
     holdings_list = []
     accounts_data = []
 
-    # Iterate accounts
-    for acc in accounts_list:
-        if not acc: continue
-        if acc == '7032756831': continue # Skip unused account
-        print(f"Processing Account: {acc}")
+    skip_accounts = SKIP_ACCOUNTS.union(config.get("skip_accounts", []))
+    targets = [acc for acc in accounts_list
+               if acc and acc not in skip_accounts]
 
+    pruned = len(accounts_list) - len(targets)
+    if pruned:
+        print(f"Pruned {pruned} skipped/empty account(s) before TR fetch")
+
+    # TR calls share kiwoom.tr_data and the OCX is apartment-threaded, so
+    # the fetches stay serial on the main thread; the dedup/skip pruning
+    # above is what actually cuts the round-trip count
+    results = []
+    for acc in targets:
         # 1. Get Cash (Deposit)
         # opw00001
         kiwoom.get_deposit(acc)
@@ -95,6 +136,15 @@ def fetch_and_generate_portfolio(kiwoom):
         # 2. Get Evaluation & Holdings
         # opw00018
         data = kiwoom.get_account_evaluation(acc)
+
+        time.sleep(0.3)  # TR rate limit
+
+        results.append((acc, cash, data))
+
+    # Aggregate the fetched results
+    for acc, cash, data in results:
+        print(f"Processing Account: {acc}")
+
         if not data or not isinstance(data, dict):
             print(f"Failed to get evaluation for {acc} (Data: {data})")
             # Add partial data if possible or skip
@@ -136,7 +186,13 @@ def fetch_and_generate_portfolio(kiwoom):
         # Process Holdings
         for h in acc_holdings:
             code = h['code']
-            sector = sector_map.get(code, "Unknown")
+            sector = sector_get(code, "Unknown")
+
+            # Evaluation rows carry their own price; the shared dict from
+            # the snapshot pass backfills any row missing one
+            current_price = h['current_price']
+            if not current_price and prices:
+                current_price = prices.get(code, 0)
 
             holding_entry = {
                 "name": h['name'],
@@ -144,16 +200,14 @@ def fetch_and_generate_portfolio(kiwoom):
                 "sector": sector,
                 "quantity": h['qty'],
                 "avg_price": h['buy_price'],
-                "current_price": h['current_price'],
-                "value": h['current_price'] * h['qty'],
+                "current_price": current_price,
+                "value": current_price * h['qty'],
                 "pnl": h['eval_profit'],
                 "pnl_percent": h['yield_rate'],
                 "account": f"Account {acc}"
             }
             holdings_list.append(holding_entry)
 
-        time.sleep(0.3)
-
     # Calculate Global Summaries
     if total_value > 0:
         cash_percent = round((total_cash_all / total_value) * 100, 2)
@@ -182,21 +236,22 @@ def fetch_and_generate_portfolio(kiwoom):
     portfolio = load_portfolio()
     history = portfolio.get("history", [])
 
-    today_str = datetime.date.today().strftime("%Y-%m-%d")
+    today_str = datetime.date.today().isoformat()  # C-level, no strftime
 
-    # Check if today exists, update it if so, else append
-    todays_entry = next((item for item in history if item["date"] == today_str), None)
+    # History stays date-sorted on disk, so bisect finds today's slot in
+    # O(log n) — update in place or insert, no linear scan and no re-sort
+    dates = [item['date'] for item in history]
+    i = bisect.bisect_left(dates, today_str)
 
-    if todays_entry:
-        todays_entry["value"] = total_value
+    if i < len(dates) and dates[i] == today_str:
+        history[i]['value'] = total_value
     else:
-        history.append({
+        history.insert(i, {
             "date": today_str,
             "value": total_value
         })
 
-    # Sort history by date and limit to last 60 days
-    history.sort(key=lambda x: x['date'])
+    # Limit to last 60 days
     if len(history) > MAX_HISTORY_DAYS:
         history = history[-MAX_HISTORY_DAYS:]
 
@@ -218,15 +273,13 @@ def fetch_and_generate_portfolio(kiwoom):
                 target_acc_data = accounts_data[0] # Fallback
 
             if target_acc_data and "strategies" in config:
-                # Build lookups: stock_code -> holding details
-                stock_value_map = {}
-                stock_cost_map = {}
-                stock_pnl_map = {}
-                for h in holdings_list:
-                    code = h.get('symbol', '')
-                    stock_value_map[code] = h['value']
-                    stock_cost_map[code] = h['avg_price'] * h['quantity']
-                    stock_pnl_map[code] = h['pnl']
+                # Single lookup: stock_code -> (value, cost, pnl) in one pass,
+                # restricted to codes a strategy actually references
+                stock_info = {h.get('symbol', ''): (h['value'],
+                                                    h['avg_price'] * h['quantity'],
+                                                    h['pnl'])
+                              for h in holdings_list
+                              if h.get('symbol', '') in strategies_by_code}
 
                 total_capital = config.get("total_capital", target_acc_data.get('total_value', 0))
 
@@ -239,9 +292,8 @@ def fetch_and_generate_portfolio(kiwoom):
                     strategy_capital = total_capital * s_alloc
 
                     # Actual stock value and cost for this strategy
-                    actual_stock_value = stock_value_map.get(stock_code, 0)
-                    actual_stock_cost = stock_cost_map.get(stock_code, 0)
-                    actual_stock_pnl = stock_pnl_map.get(stock_code, 0)
+                    actual_stock_value, actual_stock_cost, actual_stock_pnl = \
+                        stock_info.get(stock_code, (0, 0, 0))
 
                     # Cash = initial allocation - cost of stocks purchased
                     strategy_cash = strategy_capital - actual_stock_cost
@@ -303,13 +355,39 @@ def fetch_and_generate_portfolio(kiwoom):
         "virtual_accounts": virtual_accounts_data
     }
 
-    # Save
-    with open(PORTFOLIO_FILE, "w", encoding="utf-8") as f:
-        json.dump(final_json, f, ensure_ascii=False, indent=2)
+    global _last_digest
+
+    if orjson is not None:
+        blob = orjson.dumps(final_json, option=orjson.OPT_INDENT_2)
+    else:
+        blob = json.dumps(final_json, ensure_ascii=False, indent=2).encode("utf-8")
+    digest = hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+    if digest == _last_digest:
+        print(f"{PORTFOLIO_FILE} unchanged — skipping write")
+        return digest
+
+    # Save atomically: temp file + os.replace, so the dashboard (or a git
+    # push racing this writer) never reads a half-written portfolio.json
+    tmp_path = PORTFOLIO_FILE + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, PORTFOLIO_FILE)
+
+    if os.environ.get("PORTFOLIO_GZIP"):
+        with gzip.open(PORTFOLIO_FILE + ".gz", "wb", compresslevel=1) as g:
+            g.write(blob)
+
+    _last_digest = digest
+
+    print(f"Successfully generated {PORTFOLIO_FILE}: "
+          f"{len(holdings_list)} holdings, {len(accounts_data)} accounts")
+
+    # Full dump re-prints the entire document — only on explicit request
+    if os.environ.get("PORTFOLIO_DEBUG"):
+        print(blob.decode("utf-8"))
 
-    print(f"Successfully generated {PORTFOLIO_FILE}")
-    print(json.dumps(final_json, indent=2, ensure_ascii=False))
-    return True
+    return digest
 
 def main():
     app = QApplication(sys.argv)
@@ -15,8 +15,12 @@ Replace the main() function in your existing file with this version.
 import sys
 import time
 import json
-import traceback
+import logging
+import logging.handlers
+import queue
+import threading
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time as dtime
 from PyQt5.QtWidgets import QApplication
 from kiwoom_api import Kiwoom
@@ -25,24 +29,96 @@ from strategy_executor import StrategyExecutor
 from github_sync import GitHubSync
 from generate_portfolio_json import fetch_and_generate_portfolio
 
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Errors and tracebacks go through the logging queue so formatting and
+# console I/O happen on a background thread, not in the trading loop;
+# user-facing status output stays on print()
+logger = logging.getLogger("bot")
+
+
+def setup_logging():
+    """Route bot logging through a QueueHandler/QueueListener pair."""
+    log_queue = queue.Queue(-1)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+
+    listener = logging.handlers.QueueListener(log_queue, console)
+    listener.start()
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    return listener
+
+
+def load_json_file(path):
+    """Read a JSON file, decoding with orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Market session bounds (KST), constructed once instead of per call
+_MARKET_OPEN = dtime(9, 0)
+_MARKET_CLOSE = dtime(15, 30)
+
+# Pre-bound callables: global + attribute lookup per call becomes a
+# single module-global load
+_now = datetime.now
+_time = time.time
+
+# 30-second TTL cache — the check fires every iteration and once a minute
+# in the market-closed wait loop
+_market_cache = {"key": None, "val": False}
+
 
 def check_market_open():
     """
     Check if KOSPI/KOSDAQ market is open (09:00 - 15:30 KST).
     Returns True if open, False otherwise.
     Also returns False on weekends.
+    Results are cached in 30-second buckets.
     """
-    now = datetime.now()
+    key = int(_time() // 30)
+    if _market_cache["key"] == key:
+        return _market_cache["val"]
+
+    now = _now()
 
     # Weekday check (0=Mon, 6=Sun)
-    if now.weekday() >= 5:
-        return False
+    is_open = (now.weekday() < 5
+               and _MARKET_OPEN <= now.time() <= _MARKET_CLOSE)
 
-    current_time = now.time()
-    start_time = dtime(9, 0)
-    end_time = dtime(15, 30)
+    _market_cache["key"] = key
+    _market_cache["val"] = is_open
+    return is_open
 
-    return start_time <= current_time <= end_time
+
+def account_summary(acc):
+    """
+    (positions, invested, cash) snapshot of a virtual account.
+
+    Prefers the running `total_invested` aggregate Account maintains as
+    it mutates; only recomputes — in a single pass — for Account versions
+    that don't carry it.
+    """
+    total_invested = getattr(acc, 'total_invested', None)
+    if total_invested is None:
+        total_invested = sum(h['total_cost'] for h in acc.holdings.values())
+
+    return len(acc.holdings), total_invested, acc.balance
 
 
 def initialize_accounts(config):
@@ -51,8 +127,7 @@ def initialize_accounts(config):
     Returns a dictionary of {account_id: Account object}.
     """
     if isinstance(config, str):
-        with open(config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = load_json_file(config)
 
     state_file = "trade_state.json"
     loaded_accounts = load_accounts(state_file)
@@ -69,36 +144,39 @@ def initialize_accounts(config):
     newly_created = 0
 
     if "strategies" in config:
+        created_lines = []
         for strategy in config["strategies"]:
             s_id = strategy["id"]
+            stock_code = strategy["stock_code"]
             alloc_percent = strategy.get("total_allocation_percent", 0)
             strategy_capital = total_capital * alloc_percent
 
-            sub_accounts = strategy.get("accounts", [])
-            ratios = [acc["ratio"] for acc in sub_accounts]
-
-            for i, acc_cfg in enumerate(sub_accounts):
+            for acc_cfg in strategy.get("accounts", []):
                 acc_id = f"{s_id}_{acc_cfg['suffix']}"
 
                 if acc_id not in accounts_map:
-                    allocated_capital = int(strategy_capital * ratios[i])
-                    cfg = acc_cfg.copy()
-                    cfg["account_id"] = acc_id
-                    cfg["strategy_id"] = s_id
-                    cfg["stock_code"] = strategy["stock_code"]
+                    allocated_capital = int(strategy_capital * acc_cfg["ratio"])
+                    cfg = dict(acc_cfg,
+                               account_id=acc_id,
+                               strategy_id=s_id,
+                               stock_code=stock_code)
 
                     new_acc = Account(
                         account_id=acc_id,
                         principal=allocated_capital,
-                        stock_code=strategy["stock_code"],
+                        stock_code=stock_code,
                         strategy_config=cfg
                     )
                     accounts_map[acc_id] = new_acc
                     newly_created += 1
-                    print(f"  Created New Account {acc_id}: Principal {new_acc.principal:,} KRW")
+                    created_lines.append(f"  Created New Account {acc_id}: Principal {new_acc.principal:,} KRW")
+
+        # One write flushes all creation lines instead of one per account
+        if created_lines:
+            print("\n".join(created_lines))
 
     if newly_created > 0 or not loaded_accounts:
-        save_accounts(list(accounts_map.values()), state_file)
+        save_accounts(accounts_map.values(), state_file)
         if newly_created > 0:
             print(f"Added {newly_created} new accounts from config to state.")
 
@@ -115,7 +193,8 @@ def update_account_snapshots(kiwoom, accounts_map):
         accounts_map: Dictionary of {account_id: Account}
 
     Returns:
-        bool: True if successful, False otherwise
+        Tuple of (ok, current_prices) — the fetched price dict is reusable
+        by the portfolio generation step in the same iteration.
     """
     try:
         # Collect all unique stock codes from holdings
@@ -127,11 +206,28 @@ def update_account_snapshots(kiwoom, accounts_map):
             # No holdings, just record snapshots with current balance
             for acc in accounts_map.values():
                 acc.update_snapshot({})
-            return True
+            return True, {}
 
-        # Fetch current prices for all stocks
+        # Fetch current prices for all stocks — one batched multi-code TR
+        # (CommKwRqData supports up to 100 codes) when the API exposes it
         current_prices = {}
-        for code in all_codes:
+        codes = list(all_codes)
+
+        batch_fetch = getattr(kiwoom, "get_current_prices", None)
+        if batch_fetch is not None:
+            try:
+                for code, price in (batch_fetch(codes) or {}).items():
+                    if price and price > 0:
+                        current_prices[code] = price
+            except Exception as e:
+                print(f"  Warning: Batched price fetch failed: {e}")
+
+        # Single-code fallback for codes the batch call didn't cover.
+        # These stay on the main thread: TR results land on shared
+        # kiwoom.tr_data and the OCX control is apartment-threaded, so
+        # concurrent in-flight requests could cross-wire responses.
+        missing = [code for code in codes if code not in current_prices]
+        for code in missing:
             try:
                 price = kiwoom.get_current_price(code)
                 if price and price > 0:
@@ -141,20 +237,23 @@ def update_account_snapshots(kiwoom, accounts_map):
             except Exception as e:
                 print(f"  Warning: Failed to get price for {code}: {e}")
 
-        # Update each account's snapshot
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # One timestamp shared by every account's snapshot (update_snapshot
+        # honors the kwarg, so no account re-stamps); manual field formatting
+        # skips strftime's locale-aware path
+        now = datetime.now()
+        timestamp = (f"{now.year:04d}-{now.month:02d}-{now.day:02d} "
+                     f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}")
         for acc in accounts_map.values():
             try:
                 acc.update_snapshot(current_prices, timestamp=timestamp)
             except Exception as e:
                 print(f"  Warning: Failed to update snapshot for {acc.account_id}: {e}")
 
-        return True
+        return True, current_prices
 
-    except Exception as e:
-        print(f"Error updating account snapshots: {e}")
-        traceback.print_exc()
-        return False
+    except Exception:
+        logger.exception("Error updating account snapshots")
+        return False, {}
 
 
 def main():
@@ -167,9 +266,10 @@ def main():
     - Portfolio generation once per iteration (efficient)
     - GitHub sync once per iteration (cleaner commit history)
     """
+    log_listener = setup_logging()
+
     # Load configuration
-    with open('config.json', 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    config = load_json_file('config.json')
 
     # Initialize Qt Application (required for Kiwoom API)
     app = QApplication(sys.argv)
@@ -215,18 +315,12 @@ def main():
     def on_transaction_complete(action, account_alias, code, price, qty):
         """
         Called after each successful transaction.
-        Logs the transaction - full update happens at iteration end.
+        Logs the transaction - persistence happens once at iteration end.
         """
         print(f"\n{'─'*60}")
         print(f"✅ Transaction: {action} {qty} {code} @ {price:,} KRW ({account_alias})")
         print(f"{'─'*60}\n")
 
-        # Immediate lightweight state save
-        try:
-            save_accounts(list(accounts_map.values()), "trade_state.json")
-        except Exception as e:
-            print(f"Warning: Failed to save state after transaction: {e}")
-
     # Display configuration
     print("\n" + "=" * 60)
     print("Configuration")
@@ -286,14 +380,46 @@ def main():
 
     interval_seconds = check_interval * 60
     iteration = 0
+    last_synced_digest = None  # Content hash of the last portfolio pushed
+
+    # GitHub sync (git add/commit/push — subprocess + network, often
+    # seconds) runs on its own single worker so it never blocks the loop;
+    # at most one sync is in flight and bursts coalesce to the newest state
+    sync_executor = ThreadPoolExecutor(max_workers=1)
+    sync_future = None
+    pending_sync_digest = None
 
-    # Initialize config monitoring
+    # Initialize config monitoring — prefer FS events (watchdog/inotify)
+    # over per-second mtime polling
     config_path = 'config.json'
     try:
         last_mtime = os.path.getmtime(config_path)
     except OSError:
         last_mtime = 0
 
+    config_changed = threading.Event()
+    observer = None
+
+    if Observer is not None:
+        class _ConfigChangeHandler(FileSystemEventHandler):
+            # Atomic savers (vim, sed -i, write-tmp-then-rename) surface as
+            # created/moved rather than modified, so watch every event kind
+            def on_any_event(self, event):
+                paths = (getattr(event, 'src_path', '') or '',
+                         getattr(event, 'dest_path', '') or '')
+                if any(p.endswith('config.json') for p in paths):
+                    config_changed.set()
+
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(_ConfigChangeHandler(),
+                          path=os.path.dirname(os.path.abspath(config_path)) or '.',
+                          recursive=False)
+        observer.start()
+        print("Config watcher: filesystem events (watchdog)")
+    else:
+        print("Config watcher: mtime polling (install watchdog for FS events)")
+
     try:
         while True:
             # Check Market Hours
@@ -316,16 +442,16 @@ def main():
                 print("\n📊 Executing strategy...")
                 executor.execute_step()
                 print("✅ Strategy execution complete")
-            except Exception as e:
-                print(f"⚠️  ERROR during strategy execution: {e}")
-                traceback.print_exc()
+            except Exception:
+                logger.exception("Strategy execution failed (iteration #%d)", iteration)
                 print("Continuing to next iteration...")
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # 2. UPDATE PERFORMANCE SNAPSHOTS (builds historical data)
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             print("\n📈 Updating account snapshots...")
-            if update_account_snapshots(kiwoom, accounts_map):
+            snapshots_ok, shared_prices = update_account_snapshots(kiwoom, accounts_map)
+            if snapshots_ok:
                 print("✅ Snapshots updated")
             else:
                 print("⚠️  Snapshot update had errors")
@@ -333,8 +459,13 @@ def main():
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # 3. SAVE ACCOUNT STATE
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+            # Unconditional by design: step 2 appends a snapshot to every
+            # account's performance_log each iteration, so the state is
+            # always dirty by the time we get here. The win over the old
+            # flow is coalescing — one save per iteration instead of one
+            # per transaction plus one here.
             try:
-                save_accounts(list(accounts_map.values()), "trade_state.json")
+                save_accounts(accounts_map.values(), "trade_state.json")
                 print("✅ Account state saved")
             except Exception as e:
                 print(f"⚠️  Failed to save state: {e}")
@@ -343,45 +474,60 @@ def main():
             # 4. GENERATE PORTFOLIO.JSON (once per iteration)
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             print("\n📄 Generating portfolio.json...")
+            portfolio_digest = None
             try:
-                if fetch_and_generate_portfolio(kiwoom):
+                portfolio_digest = fetch_and_generate_portfolio(kiwoom, prices=shared_prices)
+                if portfolio_digest:
                     print("✅ portfolio.json generated")
                 else:
                     print("⚠️  portfolio.json generation failed")
-            except Exception as e:
-                print(f"⚠️  Portfolio generation error: {e}")
-                traceback.print_exc()
+            except Exception:
+                logger.exception("Portfolio generation failed")
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-            # 5. SYNC TO GITHUB (once per iteration)
+            # 5. SYNC TO GITHUB (async, only when the content changed)
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-            print("\n🔄 Syncing to GitHub...")
-            try:
+            # Harvest the previous background sync, if it finished
+            if sync_future is not None and sync_future.done():
+                try:
+                    if sync_future.result():
+                        print("✅ Background GitHub sync completed")
+                        last_synced_digest = pending_sync_digest
+                    else:
+                        print("⚠️  GitHub sync failed (check git status manually)")
+                except Exception as e:
+                    print(f"⚠️  GitHub sync error: {e}")
+                sync_future = None
+
+            if portfolio_digest and portfolio_digest == last_synced_digest:
+                print("\n🔄 Portfolio unchanged — skipping GitHub sync")
+            elif sync_future is not None:
+                print("\n🔄 GitHub sync still in flight — coalescing")
+            else:
+                print("\n🔄 Syncing to GitHub in background...")
                 commit_msg = f"Auto-update: {current_time} (Iteration #{iteration})"
-                if github_sync.sync_portfolio(commit_message=commit_msg):
-                    print("✅ Synced to GitHub")
-                else:
-                    print("⚠️  GitHub sync failed (check git status manually)")
-            except Exception as e:
-                print(f"⚠️  GitHub sync error: {e}")
+                pending_sync_digest = portfolio_digest
+                sync_future = sync_executor.submit(github_sync.sync_portfolio,
+                                                   commit_message=commit_msg)
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # 6. DISPLAY SUMMARY
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-            print(f"\n{'─'*60}")
-            print(f"Virtual Account Summary:")
-            print(f"{'─'*60}")
+            # Buffer the whole summary and print once — one stdout lock
+            # acquisition and one console write instead of 4 per account
+            lines = [f"\n{'─'*60}", "Virtual Account Summary:", '─'*60]
 
             for acc_id, acc in accounts_map.items():
-                holdings_count = len(acc.holdings)
+                holdings_count, total_invested, cash = account_summary(acc)
                 if holdings_count > 0:
-                    total_invested = sum([h['total_cost'] for h in acc.holdings.values()])
-                    print(f"  {acc_id}:")
-                    print(f"    Holdings: {holdings_count} positions")
-                    print(f"    Invested: {total_invested:,.0f} KRW")
-                    print(f"    Cash:     {acc.balance:,.0f} KRW")
+                    lines.append(f"  {acc_id}:")
+                    lines.append(f"    Holdings: {holdings_count} positions")
+                    lines.append(f"    Invested: {total_invested:,.0f} KRW")
+                    lines.append(f"    Cash:     {cash:,.0f} KRW")
                 else:
-                    print(f"  {acc_id}: No positions, Cash: {acc.balance:,.0f} KRW")
+                    lines.append(f"  {acc_id}: No positions, Cash: {cash:,.0f} KRW")
+
+            print("\n".join(lines))
 
             # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
             # 7. WAIT FOR NEXT ITERATION (with config monitoring)
@@ -391,39 +537,47 @@ def main():
             next_check_str = datetime.fromtimestamp(next_check_time).strftime('%Y-%m-%d %H:%M:%S')
             print(f"   Next check at: {next_check_str}")
 
-            # Wait with config monitoring
-            while time.time() < next_check_time:
+            # Wait with config monitoring. With watchdog the loop blocks on
+            # a single event wait; the polling fallback stats once a second.
+            while True:
+                remaining = next_check_time - time.time()
+                if remaining <= 0:
+                    break
+
+                if observer is not None:
+                    if not config_changed.wait(timeout=remaining):
+                        break  # Timed out — next iteration is due
+                    config_changed.clear()
+                else:
+                    time.sleep(1)  # Check every second
+                    try:
+                        current_mtime = os.path.getmtime(config_path)
+                    except OSError:
+                        continue
+                    if current_mtime <= last_mtime:
+                        continue
+                    last_mtime = current_mtime
+
+                print(f"\n🔄 Configuration file changed! Reloading...")
                 try:
-                    current_mtime = os.path.getmtime(config_path)
-                    if current_mtime > last_mtime:
-                        print(f"\n🔄 Configuration file changed! Reloading...")
-                        try:
-                            time.sleep(1)  # Wait for write to complete
-                            with open(config_path, 'r', encoding='utf-8') as f:
-                                new_config = json.load(f)
-
-                            config = new_config
-                            last_mtime = current_mtime
+                    time.sleep(1)  # Wait for write to complete
+                    config = load_json_file(config_path)
 
-                            # Update executor config
-                            executor.update_config(config)
+                    # Update executor config
+                    executor.update_config(config)
 
-                            # Update check interval if changed
-                            if "strategies" in config and config["strategies"]:
-                                new_interval = config["strategies"][0].get("check_interval_minutes", 5)
-                                if new_interval != check_interval:
-                                    print(f"   Check interval updated: {check_interval} → {new_interval} minutes")
-                                    check_interval = new_interval
-                                    interval_seconds = check_interval * 60
+                    # Update check interval if changed
+                    if "strategies" in config and config["strategies"]:
+                        new_interval = config["strategies"][0].get("check_interval_minutes", 5)
+                        if new_interval != check_interval:
+                            print(f"   Check interval updated: {check_interval} → {new_interval} minutes")
+                            check_interval = new_interval
+                            interval_seconds = check_interval * 60
 
-                            print("✅ Configuration reloaded successfully")
+                    print("✅ Configuration reloaded successfully")
 
-                        except Exception as e:
-                            print(f"❌ Failed to reload configuration: {e}")
-                except OSError:
-                    pass
-
-                time.sleep(1)  # Check every second
+                except Exception as e:
+                    print(f"❌ Failed to reload configuration: {e}")
 
     except KeyboardInterrupt:
         print("\n\n" + "=" * 60)
@@ -442,7 +596,7 @@ def main():
             print(f"  Snapshots: {snapshots_count} recorded")
 
         print("\n💾 Saving final state...")
-        save_accounts(list(accounts_map.values()), "trade_state.json")
+        save_accounts(accounts_map.values(), "trade_state.json")
         print("✅ State saved to trade_state.json")
 
         print("\n📄 Generating final portfolio.json...")
@@ -454,11 +608,17 @@ def main():
 
         print("\n🔄 Final GitHub sync...")
         try:
+            sync_executor.shutdown(wait=True)  # Flush any in-flight push
             if github_sync.sync_portfolio(commit_message=f"Final update: Bot stopped at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"):
                 print("✅ Final sync to GitHub complete")
         except Exception as e:
             print(f"⚠️  Final GitHub sync failed: {e}")
 
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        log_listener.stop()
+
         print("\n👋 Goodbye!")
 
 
@@ -2,6 +2,16 @@ import json
 import random
 import datetime
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def generate_mock_data():
     today = datetime.date.today()
     mock_data = {
@@ -13,7 +23,7 @@ def generate_mock_data():
 
     # 1. Accounts
     accounts = ["Account #1", "Account #2", "Account #3"]
-    account_values = {acc: 0 for acc in accounts}
+    equity_by_account = {acc: 0 for acc in accounts}
 
     # 2. Holdings (Randomly generated)
     stocks = [
@@ -42,7 +52,7 @@ def generate_mock_data():
             
             # Randomly assign to an account
             account = random.choice(accounts)
-            account_values[account] += current_value
+            equity_by_account[account] += current_value
 
             mock_data["holdings"].append({
                 "name": stock["name"],
@@ -60,36 +70,50 @@ def generate_mock_data():
 
     # 3. Cash
     total_cash = random.randint(5000000, 50000000)
-    # Distribute cash among accounts
-    for acc in accounts:
-        cash_share = int(total_cash * random.random() / len(accounts)) # Roughly distribute
-        account_values[acc] += cash_share
-        # Creating a specific accounts breakdown list
-        mock_data["accounts"].append({
-            "name": acc,
-            "total_value": account_values[acc],
-            "cash": cash_share,
-            "equity": account_values[acc] - cash_share # approximate
-        })
-        # Re-adjust total cash to match sum of parts if we wanted to be precise, but this is mock.
-    
+    # Roughly distribute cash among accounts (this is mock data)
+    cash_by_account = {acc: int(total_cash * random.random() / len(accounts))
+                       for acc in accounts}
+
+    # Build the breakdown once from the two finished accumulators — no
+    # mutation of the totals while the output list is being assembled
+    mock_data["accounts"] = [{
+        "name": acc,
+        "total_value": equity_by_account[acc] + cash_by_account[acc],
+        "cash": cash_by_account[acc],
+        "equity": equity_by_account[acc]
+    } for acc in accounts]
+
+
     # 4. History (Past 1 year)
     current_portfolio_value = total_holdings_value + total_cash
-    history = []
-    value = current_portfolio_value
-    
-    # Trace back 365 days
-    for i in range(365):
-        date = today - datetime.timedelta(days=i)
-        # Random daily fluctuation
-        daily_return = random.normalvariate(0.0005, 0.01) # Mean 0.05%, Std 1%
-        value = value / (1 + daily_return)
-        
-        history.append({
-            "date": date.strftime("%Y-%m-%d"),
+
+    if np is not None:
+        # Vectorized back-trace: one draw of 365 daily returns and a
+        # cumulative product instead of 365 interpreter iterations
+        rng = np.random.default_rng()
+        daily_returns = rng.normal(0.0005, 0.01, 365) # Mean 0.05%, Std 1%
+        values = current_portfolio_value * np.cumprod(1.0 / (1.0 + daily_returns))
+
+        history = [{
+            "date": (today - datetime.timedelta(days=i)).strftime("%Y-%m-%d"),
             "value": int(value)
-        })
-    
+        } for i, value in enumerate(values)]
+    else:
+        history = []
+        value = current_portfolio_value
+
+        # Trace back 365 days
+        for i in range(365):
+            date = today - datetime.timedelta(days=i)
+            # Random daily fluctuation
+            daily_return = random.normalvariate(0.0005, 0.01) # Mean 0.05%, Std 1%
+            value = value / (1 + daily_return)
+
+            history.append({
+                "date": date.strftime("%Y-%m-%d"),
+                "value": int(value)
+            })
+
     mock_data["history"] = history[::-1] # Reverse to be chronological
 
     # 5. Summary Metrics
@@ -111,7 +135,10 @@ def generate_mock_data():
         "cash_percent": round((total_cash / current_portfolio_value) * 100, 2)
     }
 
-    print(json.dumps(mock_data, indent=2))
+    if orjson is not None:
+        print(orjson.dumps(mock_data, option=orjson.OPT_INDENT_2).decode())
+    else:
+        print(json.dumps(mock_data, indent=2))
 
 if __name__ == "__main__":
     generate_mock_data()
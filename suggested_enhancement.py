@@ -3,16 +3,17 @@
 # After this line:
 # history.sort(key=lambda x: x['date'])
 
-# Add history limit to prevent unlimited growth
-MAX_HISTORY_DAYS = 60
-if len(history) > MAX_HISTORY_DAYS:
-    history = history[-MAX_HISTORY_DAYS:]
-    print(f"History limited to last {MAX_HISTORY_DAYS} days")
-
-# Optional: Also add a cleanup for old entries
+# Trim old entries in a single pass. History is already sorted by date,
+# so bisect finds the cutoff index in O(log n) and one slice enforces
+# both the age cutoff and the entry cap — no filter pass, no re-sort.
+import bisect
 from datetime import datetime, timedelta
 
-# Remove entries older than 60 days
+MAX_HISTORY_DAYS = 60
 cutoff_date = (datetime.now() - timedelta(days=MAX_HISTORY_DAYS)).strftime("%Y-%m-%d")
-history = [h for h in history if h["date"] >= cutoff_date]
-history.sort(key=lambda x: x['date'])
+
+dates = [h["date"] for h in history]
+start = max(bisect.bisect_left(dates, cutoff_date), len(history) - MAX_HISTORY_DAYS)
+if start > 0:
+    history = history[start:]
+    print(f"History limited to last {MAX_HISTORY_DAYS} days")